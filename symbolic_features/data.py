@@ -1,24 +1,196 @@
+import contextlib
+import functools
+import hashlib
 import os
 import pickle
+import re
 import sqlite3
+import tempfile
+import threading
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from dataclasses import dataclass
+from itertools import repeat
 from pathlib import Path
-from typing import Callable, List, Optional, Tuple, Union, Iterable
+from typing import Callable, Dict, List, Optional, Tuple, Union, Iterable, Iterator
 
-import chardet
 import music21
 import numpy as np
 import pandas as pd
-from rich.progress import track
+from pandas._libs.parsers import STR_NA_VALUES
+from rich.progress import Progress, track
 from sklearn.decomposition import PCA
 from sklearn.preprocessing import StandardScaler
 
 from . import settings as S
-from .utils import logger
+from .utils import detect_encoding, logger
+
+try:
+    import pyarrow as pa
+    from pyarrow import csv as pacsv
+except ImportError:
+    pa = pacsv = None
 
 __all_exts__ = (".mid", ".xml", ".musicxml", ".mxl", ".krn")
 
 
+class _LastRead(threading.local):
+    """
+    The legal rows of the last csv file read by the current thread, shared by the
+    tasks whose feature sets use the same csv file (e.g. `musif` and `musif_native`).
+    """
+
+    def __init__(self):
+        self.rows = {}
+
+
+_last_read = _LastRead()
+
+# regexes used for extracting labels from file names, compiled once
+DIDONE_RE = re.compile(r".*/xml/[\w -]+-1(\d{2})\d-[\w\[\]-]+")
+JLR_RE = re.compile(r".*mass-duos-corpus-josquin-larue/([\s\w\(\)]+)/.*")
+
+
+def read_csv(
+    csv_path: Union[str, Path],
+    encoding: Optional[str] = None,
+    chunksize: Optional[int] = None,
+    float32: bool = False,
+    keep_str_cols: Optional[Iterable[str]] = None,
+) -> Union[pd.DataFrame, Iterator[pd.DataFrame]]:
+    """
+    Reads a csv file using the multi-threaded pyarrow parser if pyarrow is installed,
+    otherwise using `pd.read_csv`. As pandas does, columns without a name are renamed
+    `Unnamed: <position>`, duplicated names get a `.<n>` suffix and pandas' default
+    strings are parsed as missing values.
+
+    Parameters:
+    csv_path (Union[str, Path]): The path to the csv file.
+    encoding (Optional[str]): The encoding of the file. Defaults to None (utf-8).
+    chunksize (Optional[int]): If not None, an iterator over DataFrames of
+    `chunksize` rows is returned, as with `pd.read_csv`. Defaults to None.
+    float32 (bool): If True and pyarrow is installed, float columns are loaded as
+    float32 instead of float64. Defaults to False.
+    keep_str_cols (Optional[Iterable[str]]): If not None, text columns are not loaded,
+    except the ones listed here. Without pyarrow, text columns are detected from
+    the first 100 rows. Defaults to None (all columns are loaded).
+
+    Returns:
+    Union[pd.DataFrame, Iterator[pd.DataFrame]]: The loaded DataFrame or an iterator
+    over its chunks.
+
+    Raises:
+    UnicodeDecodeError: If the file cannot be decoded with the given encoding (when
+    chunksize is not None, it may be raised while iterating).
+    """
+    if pacsv is not None:
+        table = _read_arrow_table(csv_path, encoding, float32)
+    else:
+        table = None
+    if table is None:
+        usecols = None
+        if keep_str_cols is not None:
+            probe = pd.read_csv(csv_path, encoding=encoding, nrows=100)
+            usecols = [
+                i
+                for i, (c, t) in enumerate(probe.dtypes.items())
+                if t != object or c in keep_str_cols
+            ]
+        return pd.read_csv(
+            csv_path, encoding=encoding, chunksize=chunksize, usecols=usecols
+        )
+
+    columns = _dedup_names(
+        [c if c != "" else f"Unnamed: {i}" for i, c in enumerate(table.column_names)]
+    )
+    # duplicated names can't be converted to pandas
+    table = table.rename_columns(columns)
+    if keep_str_cols is not None:
+        # text columns are the most expensive to convert to pandas (one python
+        # object per value)
+        keep = [
+            i
+            for i, (c, t) in enumerate(zip(columns, table.schema.types))
+            if not (pa.types.is_string(t) or pa.types.is_large_string(t))
+            or c in keep_str_cols
+        ]
+        table = table.select(keep)
+    if chunksize is not None:
+        return _iter_arrow_table(table, chunksize)
+    df = table.to_pandas(self_destruct=True)
+    del table
+    return df
+
+
+def _dedup_names(names: List[str]) -> List[str]:
+    """
+    Renames duplicated column names as `pd.read_csv` does: `a`, `a.1`, `a.2`...
+    skipping the names that appear in the header.
+    """
+    counts = defaultdict(int)
+    names = list(names)
+    header = set(names)
+    for i, name in enumerate(names):
+        old_name = name
+        count = counts[name]
+        while count > 0:
+            counts[old_name] = count + 1
+            name = f"{old_name}.{count}"
+            if name in header:
+                count += 1
+            else:
+                count = counts[name]
+        names[i] = name
+        counts[name] = count + 1
+    return names
+
+
+def _read_arrow_table(
+    csv_path: Union[str, Path], encoding: Optional[str], float32: bool = False
+):
+    """
+    Reads a csv file with pyarrow. Returns None if the file cannot be decoded.
+    """
+    read_options = pacsv.ReadOptions(use_threads=True, encoding=encoding or "utf8")
+    # the same missing values as pandas (pyarrow's defaults differ), also in text
+    # columns
+    convert_options = pacsv.ConvertOptions(
+        null_values=sorted(STR_NA_VALUES), strings_can_be_null=True
+    )
+    try:
+        # memory-mapped: the parser reads the pages cached by the OS without
+        # copying them into a buffer
+        with pa.memory_map(str(csv_path), "r") as source:
+            table = pacsv.read_csv(
+                source, read_options=read_options, convert_options=convert_options
+            )
+    except pa.ArrowInvalid:
+        return None
+    if any(pa.types.is_binary(t) for t in table.schema.types):
+        # text that could not be decoded: the pandas parser raises a proper
+        # UnicodeDecodeError
+        return None
+
+    # columns that are entirely empty are parsed as null, pandas uses float NaN
+    for i, field in enumerate(table.schema):
+        if pa.types.is_null(field.type):
+            table = table.set_column(i, field.name, table[i].cast(pa.float64()))
+        if float32 and pa.types.is_float64(table.schema.types[i]):
+            table = table.set_column(i, field.name, table[i].cast(pa.float32()))
+    return table
+
+
+def _iter_arrow_table(table, chunksize: int) -> Iterator[pd.DataFrame]:
+    """
+    Converts a pyarrow Table to pandas `chunksize` rows at a time, keeping a
+    contiguous index across chunks like `pd.read_csv` does.
+    """
+    for start in range(0, max(table.num_rows, 1), chunksize):
+        df = table.slice(start, chunksize).to_pandas()
+        df.index = pd.RangeIndex(start, start + df.shape[0])
+        yield df
+
+
 def filter_music21_features(
     df: pd.DataFrame, feature_type: str = "both"
 ) -> pd.DataFrame:
@@ -38,15 +210,21 @@ def filter_music21_features(
     TypeError: If the input DataFrame is not a pandas DataFrame.
     ValueError: If the feature_type parameter is not one of "both", "pitch", or "rhythm".
     """
+    is_music21 = df.columns.str.match(get_music21_features_re(feature_type))
+    return df.loc[:, ~is_music21]
+
+
+@functools.lru_cache(maxsize=4)
+def get_music21_features_re(feature_type="both") -> re.Pattern:
+    """
+    Returns a compiled regex matching strings that start with one of the IDs returned
+    by `get_music21_features_ids`.
+    """
     feature_ids = get_music21_features_ids(feature_type)
-    filtered_cols = [
-        col
-        for col in df.columns
-        if not any(col.startswith(feature_id) for feature_id in feature_ids)
-    ]
-    return df[filtered_cols]
+    return re.compile("|".join(map(re.escape, feature_ids)))
 
 
+@functools.lru_cache(maxsize=4)
 def get_music21_features_ids(feature_type="both"):
     """
     Returns the list of features extracted by music21's module (IDs). It iterates all
@@ -59,8 +237,8 @@ def get_music21_features_ids(feature_type="both"):
     values are 'jSymbolic', 'native', or 'both'. Default is 'both'.
 
     Returns:
-    - features (list): A list of strings representing the IDs of the features extracted
-    by music21's module.
+    - features (tuple): A tuple of strings representing the IDs of the features
+    extracted by music21's module.
     """
     features = []
     if feature_type == "jSymbolic":
@@ -74,7 +252,7 @@ def get_music21_features_ids(feature_type="both"):
         )
     for feature_class in feature_classes:
         features.append(feature_class.id)
-    return features
+    return tuple(features)
 
 
 @dataclass
@@ -134,7 +312,7 @@ class FeatureSet:
             The parsed dataframe.
         """
         if len(self.illegal_cols) > 0:
-            df = df.drop(columns=self.illegal_cols)
+            df = df.loc[:, df.columns.difference(self.illegal_cols, sort=False)]
         if self.music21_filter is not None:
             df = filter_music21_features(df, self.music21_filter)
         return df
@@ -231,6 +409,30 @@ class Dataset:
     def __post_init__(self):
         if self.friendly_name is None:
             self.friendly_name = self.name
+        self._legal_filenames_re = re.compile(self.legal_filenames)
+
+    def filter_rows(self, df: pd.DataFrame, label_col_selector: str) -> pd.DataFrame:
+        """
+        Removes the rows whose `label_col_selector` doesn't match `legal_filenames`.
+        Rows are independent, so this can be applied chunk by chunk while reading.
+
+        Parameters:
+        -----------
+        df : pd.DataFrame
+            The input dataframe (or a chunk of it).
+        label_col_selector : str
+            The name of the column containing the labels.
+
+        Returns:
+        --------
+        pd.DataFrame
+            The dataframe with the legal rows only.
+        """
+        if self.legal_filenames == r".*":
+            # default: all the rows are legal
+            return df
+        idx = df[label_col_selector].str.fullmatch(self._legal_filenames_re).to_numpy()
+        return df.loc[idx]
 
     def parse(
         self,
@@ -240,9 +442,9 @@ class Dataset:
         remove_col_label: bool = True,
     ) -> Tuple[pd.DataFrame, pd.Series, pd.Series]:
         """
-        Parses a dataframe by removing unwanted rows, creating label, and removing label
-        column. If nsplits is not None (default) only classes with cardinality >
-        2*nsplits are retained.
+        Parses a dataframe by creating label and removing label column. Unwanted rows
+        must have already been removed with `filter_rows`. If nsplits is not None
+        (default) only classes with cardinality > 2*nsplits are retained.
 
         Parameters:
         -----------
@@ -261,49 +463,79 @@ class Dataset:
             Returns a tuple containing the parsed dataframe, the labels, and the filenames.
         """
         df, y = self.make_label(df, label_col_selector)
+        # labels are few: categorical codes make counting and filtering cheap
+        y = y.astype("category")
 
-        # removing invalid rows
-        idx = df[label_col_selector].str.fullmatch(self.legal_filenames).to_numpy()
-        df = df.loc[idx]
-        y = y.loc[idx]
         # removing classes with little cardinality
+        rows = slice(None)
         if self.nsplits is not None:
-            y_vals, y_freq = np.unique(y, return_counts=True)
-            y_vals = y_vals[y_freq > self.nsplits]
-            idx = y.isin(y_vals).to_numpy()
-            y = y.loc[idx]
-            df = df.loc[idx]
-
-        filenames = df[filename_col]
-        if remove_col_label is not None:
-            df = df.drop(columns=label_col_selector)
-        dataset_path = str(S.DATASETS[self.name])
-        filenames = filenames.str.replace(f".*{dataset_path}/?", "", regex=True)
-        return df, y, filenames
+            y_freq = y.value_counts(sort=False)
+            # removed categories become NaN, i.e. code -1
+            y = y.cat.remove_categories(y_freq.index[y_freq <= self.nsplits])
+            rows = np.flatnonzero((y.cat.codes >= 0).to_numpy())
+            y = y.take(rows)
+
+        filenames = df[filename_col].iloc[rows]
+        cols = slice(None)
+        if remove_col_label:
+            cols = df.columns != label_col_selector
+        # rows and columns are taken at once, the frame is re-indexed only once
+        df = df.iloc[rows, cols]
+        # the dataset path is a literal, no need for regex
+        dataset_path = str(S.DATASETS[self.name]) + "/"
+        filenames = filenames.str.rsplit(dataset_path, n=1).str[-1]
+        return df, y, filenames.astype("category")
+
+
+def _dir_after(paths: pd.Series, marker: str) -> pd.Series:
+    """
+    Returns the name of the directory that follows the last occurrence of `marker`
+    in each path, or NaN if there is none. Faster than a regex for literal markers.
+    """
+    labels = np.full(paths.shape[0], np.nan, dtype=object)
+    for i, path in enumerate(paths.to_numpy()):
+        start = path.rfind(marker)
+        if start < 0:
+            continue
+        start += len(marker)
+        end = path.find("/", start)
+        if end > start:
+            labels[i] = path[start:end]
+    return pd.Series(labels, index=paths.index)
 
 
 def asap_label(df: pd.DataFrame, label_col_selector: str):
-    y = df[label_col_selector].str.extract(r".*asap-dataset/(\w+)/.*", expand=False)
+    y = _dir_after(df[label_col_selector], "asap-dataset/")
     assert not y.isna().any(), "asap: NaN in y!"
     return df, y
 
 
 def didone_label(df: pd.DataFrame, label_col_selector: str):
-    y = df[label_col_selector].str.extract(
-        r".*/xml/[\w -]+-1(\d{2})\d-[\w\[\]-]+", expand=False
-    )
+    y = df[label_col_selector].str.extract(DIDONE_RE, expand=False)
     y = y.replace("97", "79")
     y = y.fillna("nd")
     assert not y.isna().any(), "Didone: NaN in y!"
     return df, y
 
 
-def ewld_label(df: pd.DataFrame, label_col_selector: str):
+@functools.lru_cache(maxsize=1)
+def ewld_genres() -> pd.DataFrame:
+    """
+    Returns the normalized path (`path_leadsheet`) and the most frequent genre of
+    each work in the EWLD database. The query is run once per process, since it is
+    the same for all the EWLD tasks.
+    """
     conn = sqlite3.connect(S.DATASETS["EWLD"] / "EWLD.db")
 
     # thanks ChatGPT
+    # the path is normalized by SQLite: extension removed and strange characters
+    # replaced
     query = """
-    SELECT works.path_leadsheet, work_genres.genre
+    SELECT
+        REPLACE(REPLACE(REPLACE(
+            SUBSTR(works.path_leadsheet, 1, LENGTH(works.path_leadsheet) - 4),
+            ',', '_'), ';', '_'), ' ', '_') AS path_leadsheet,
+        work_genres.genre
     FROM works
     JOIN work_genres ON works.id = work_genres.id
     GROUP BY works.id
@@ -312,49 +544,45 @@ def ewld_label(df: pd.DataFrame, label_col_selector: str):
 
     # execute the SQL query and convert the result to a Pandas DataFrame
     db_df = pd.read_sql_query(query, conn)
+    conn.close()
 
-    # removing path to the EWLD dataset
-    df[label_col_selector] = df[label_col_selector].str.replace(
-        rf".*{S.DATASETS['EWLD']}/", "", regex=True
-    )
-    # removing extension
-    df[label_col_selector] = df[label_col_selector].str[:-4]
-    db_df["path_leadsheet"] = db_df["path_leadsheet"].str[:-4]
+    # remove duplicates
+    return db_df.groupby("path_leadsheet").first().reset_index()
 
-    # replacing strange characters
-    db_df["path_leadsheet"] = db_df["path_leadsheet"].str.replace(",", "_")
-    db_df["path_leadsheet"] = db_df["path_leadsheet"].str.replace(";", "_")
-    db_df["path_leadsheet"] = db_df["path_leadsheet"].str.replace(" ", "_")
 
-    # remove duplicates
-    db_df = db_df.groupby("path_leadsheet").first().reset_index()
+def ewld_label(df: pd.DataFrame, label_col_selector: str):
+    db_df = ewld_genres()
+
+    # removing path to the EWLD dataset and extension
+    df[label_col_selector] = (
+        df[label_col_selector]
+        .str.rsplit(f"{S.DATASETS['EWLD']}/", n=1)
+        .str[-1]
+        .str[:-4]
+    )
 
-    # dort the dataframe by the label column and db_df by the path_leadsheet column
+    # sort the dataframe by the label column (merge keeps this order)
     df = df.sort_values(by=label_col_selector)
-    db_df = db_df.sort_values(by="path_leadsheet")
 
-    # select the rows in the DataFrame that match the database rows
-    idx = df[label_col_selector].isin(db_df["path_leadsheet"])
-    df = df[idx]
-
-    y = db_df["genre"]
-    idx = db_df["path_leadsheet"].isin(df[label_col_selector])
-    y = y[idx]
-    y.index = df.index
+    # select the rows in the DataFrame that match the database rows and pair them
+    # with their genre
+    df = df.merge(
+        db_df, how="inner", left_on=label_col_selector, right_on="path_leadsheet"
+    )
+    y = df.pop("genre")
+    df.pop("path_leadsheet")
     assert not y.isna().any(), "EWLD: NaN in y!"
     return df, y
 
 
 def jlr_label(df: pd.DataFrame, label_col_selector: str):
-    y = df[label_col_selector].str.extract(
-        r".*mass-duos-corpus-josquin-larue/([\s\w\(\)]+)/.*", expand=False
-    )
+    y = df[label_col_selector].str.extract(JLR_RE, expand=False)
     assert not y.isna().any(), "JLR: NaN in y!"
     return df, y
 
 
 def quartets_label(df: pd.DataFrame, label_col_selector: str):
-    y = df[label_col_selector].str.extract(r".*quartets/(\w+)/.*", expand=False)
+    y = _dir_after(df[label_col_selector], "quartets/")
     assert not y.isna().any(), "quartets: NaN in y!"
     return df, y
 
@@ -413,6 +641,7 @@ class Task:
     Methods:
     __post_init__: A method to initialize the object after it has been created.
     load_csv: A method to load the CSV file and clean it.
+    unload: A method to free the loaded data.
     intersect: A method to intersect the filenames of the current Task object with the
         filenames of the Task objects in the input list.
     get_csv_path: A method to get the path of the CSV file.
@@ -455,48 +684,165 @@ class Task:
                 raise FileNotFoundError(
                     f"Task doesn't have csv file: {self}, {csv_path}"
                 )
-            try:
-                self.x = pd.read_csv(csv_path)
-            except UnicodeDecodeError:
-                enc = chardet.detect(open(csv_path, "rb").read())["encoding"]
-                self.x = pd.read_csv(csv_path, encoding=enc)
+            cache_path = self._get_cache_path(csv_path, keep_first_10_pc)
+            if cache_path is not None and cache_path.exists():
+                self._read_cache(cache_path)
+            else:
+                self._clean_csv(csv_path, keep_first_10_pc)
+                if cache_path is not None:
+                    self._write_cache(cache_path)
+
+            if not keep_first_10_pc:
+                self.name += "-no-pc"
+            self.__loaded = True
 
-            # make label and removes rows that are not for this data (mainly asap and JLR)
+    def _clean_csv(self, csv_path: Path, keep_first_10_pc: bool):
+        """
+        Reads the csv file and sets `x`, `y` and `filenames_`.
+        """
+        # removes rows that are not for this data (mainly asap and JLR) while
+        # reading, so that the whole csv is never held as a DataFrame
+        try:
+            self.x = self._read_legal_rows(
+                csv_path, encoding=S.ENCODING, float32=keep_first_10_pc
+            )
+        except UnicodeDecodeError:
+            enc = detect_encoding(csv_path)
+            self.x = self._read_legal_rows(
+                csv_path, encoding=enc, float32=keep_first_10_pc
+            )
+
+        # with copy-on-write, the column selections below are views and the
+        # feature blocks are not copied at each step
+        with pd.option_context("mode.copy_on_write", True):
+            # make label
             self.x, self.y, self.filenames_ = self.dataset.parse(
                 self.x,
                 self.feature_set.filename_col,
                 self.feature_set.label_col_selector,
             )
+            # remove columns that are not features (only musif)
             self.x = self.feature_set.parse(self.x)
 
             # keep only numeric data
             self.x = self.x.select_dtypes([int, float])
             self.x.replace([np.inf, -np.inf], 0, inplace=True)
 
-            # take only the first 10 Principal Components
-            if keep_first_10_pc:
-                index = self.x.index
-                N = 10
-                scaler = StandardScaler()
-                pca = PCA(n_components=N)
-                self.x = pd.DataFrame(
-                    pca.fit_transform(scaler.fit_transform(self.x)),
-                    index=index,
-                    columns=[f"PC{i}" for i in range(N)],
-                )
-            else:
-                self.name += "-no-pc"
+        # take only the first 10 Principal Components
+        if keep_first_10_pc:
+            index = self.x.index
+            N = 10
+            # one float32 copy of the data (none to downcast if the csv was
+            # read as float32), standardized in place; randomized SVD only
+            # computes the N components needed
+            x = self.x.to_numpy(dtype=np.float32)
+            x = StandardScaler(copy=False).fit_transform(x)
+            pca = PCA(n_components=N, svd_solver="randomized", random_state=0)
+            self.x = pd.DataFrame(
+                pca.fit_transform(x),
+                index=index,
+                columns=[f"PC{i}" for i in range(N)],
+            )
 
-            # remove columns that are not features (only musif)
-            self.__loaded = True
+    def _get_cache_path(self, csv_path: Path, keep_first_10_pc: bool):
+        """
+        Returns the path of the parquet file caching the cleaned data of this task,
+        or None if pyarrow is not installed. The name depends on everything the
+        cleaned data depends on: modification time and size of the csv file (and of
+        the EWLD database, for EWLD labels), `nsplits` and `legal_filenames` of the
+        dataset, so that a stale cache is never loaded.
+        """
+        if pa is None:
+            return None
+        stat = csv_path.stat()
+        parts = [
+            stat.st_mtime_ns,
+            stat.st_size,
+            self.dataset.nsplits,
+            self.dataset.legal_filenames,
+        ]
+        if self.dataset.make_label is ewld_label:
+            db_stat = (Path(S.DATASETS["EWLD"]) / "EWLD.db").stat()
+            parts += [db_stat.st_mtime_ns, db_stat.st_size]
+        key = hashlib.md5("-".join(map(str, parts)).encode()).hexdigest()
+        name = self.name + ("" if keep_first_10_pc else "-no-pc")
+        return Path(S.OUTPUT) / ".cache" / f"{name}-{key[:16]}.parquet"
+
+    def _read_cache(self, cache_path: Path):
+        """
+        Sets `x`, `y` and `filenames_` from a parquet file written by `_write_cache`.
+        """
+        self.x = pd.read_parquet(cache_path)
+        self.y = self.x.pop("_y")
+        self.filenames_ = self.x.pop("_fn")
 
-    def intersect(self, intersect: List["Task"]):
+    def _write_cache(self, cache_path: Path):
         """
-        A method to intersect the filenames of the current Task object with the
-        filenames of the Task objects in the input list.
+        Writes `x`, `y` and `filenames_` to a parquet file.
+        """
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        df = pd.concat(
+            [self.x, self.y.rename("_y"), self.filenames_.rename("_fn")], axis=1
+        )
+        # write and rename, so that an interrupted write doesn't leave a broken cache;
+        # the temporary file is unique, so that more processes (or machines sharing
+        # the directory) can build the same cache at the same time
+        fd, tmp_path = tempfile.mkstemp(
+            dir=cache_path.parent, prefix=cache_path.name + ".", suffix=".tmp"
+        )
+        os.close(fd)
+        try:
+            # mkstemp makes it private
+            os.chmod(tmp_path, 0o644)
+            df.to_parquet(tmp_path, engine="pyarrow", compression="zstd")
+            os.replace(tmp_path, cache_path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    def _read_legal_rows(
+        self, csv_path: Path, encoding: Optional[str] = None, float32: bool = False
+    ):
+        """
+        Reads the csv file in chunks of `S.CHUNKSIZE` rows and keeps only the rows
+        accepted by the dataset. The result is reused if the previous task read the
+        same rows.
+        """
+        label_col_selector = self.feature_set.label_col_selector
+        key = (
+            csv_path,
+            self.dataset.friendly_name,
+            label_col_selector,
+            encoding,
+            float32,
+        )
+        if key not in _last_read.rows:
+            _last_read.rows.clear()
+            # only numeric columns are used as features, other text columns are
+            # not loaded
+            chunks = read_csv(
+                csv_path,
+                encoding=encoding,
+                chunksize=S.CHUNKSIZE,
+                float32=float32,
+                keep_str_cols={self.feature_set.filename_col, label_col_selector},
+            )
+            _last_read.rows[key] = pd.concat(
+                [self.dataset.filter_rows(c, label_col_selector) for c in chunks],
+                copy=False,
+            )
+        # shallow copy: columns set by the task (e.g. EWLD labels) don't alter the
+        # shared rows
+        return _last_read.rows[key].copy(deep=False)
+
+    def intersect(self, common_filenames: pd.Index):
+        """
+        A method to keep only the rows of the current Task object whose filename is
+        in `common_filenames`, i.e. the files shared by all the tasks of the same
+        dataset and extension (see `common_filenames`).
 
         Parameters:
-        intersect (List["Task"]): A list of Task objects to intersect filenames with.
+        common_filenames (pd.Index): The filenames to keep.
 
         Returns:
         None
@@ -505,21 +851,24 @@ class Task:
         N/A
         """
         assert self.__loaded, f"Task {self.name} must be loaded before intersecting"
-        intersect_rows = []
-        for task in intersect:
-            assert task.__loaded, f"Task {task.name} must be loaded before intersecting"
-            if not hasattr(task, "x"):
-                continue
-            if (
-                task.dataset.friendly_name == self.dataset.friendly_name
-                and task.extension == self.extension
-            ):
-                intersect_rows.append(task.filenames_)
-        intersect_rows = set(intersect_rows[0]).intersection(*intersect_rows)
-        idx = self.filenames_.isin(intersect_rows)
-        self.x = self.x.loc[idx.values]
-        self.y = self.y.loc[idx.values]
-        self.filenames_ = self.filenames_.loc[idx.values]
+        # positions are computed once and used for x, y and filenames
+        pos = np.flatnonzero(self.filenames_.isin(common_filenames).to_numpy())
+        self.x = self.x.take(pos)
+        self.y = self.y.take(pos).cat.remove_unused_categories()
+        self.filenames_ = self.filenames_.take(pos).cat.remove_unused_categories()
+
+    @property
+    def loaded(self) -> bool:
+        return self.__loaded
+
+    def unload(self):
+        """
+        Frees the data of the task (e.g. once it has been evaluated). The data are
+        not available anymore, since they can't be loaded again without the
+        intersection with the other tasks.
+        """
+        for attr in ("x", "y", "filenames_"):
+            self.__dict__.pop(attr, None)
 
     def get_csv_path(self):
         csv_name = self.feature_set.csvname + "-" + self.extension[1:] + ".csv"
@@ -575,24 +924,29 @@ class ConcatTask(Task):
         the columns with names `feature_set.filename_col` as index of the dataframes.
         """
         if not self.__loaded:
-            self.tasks[0].load_csv(keep_first_10_pc)
-            self.filenames_ = self.tasks[0].filenames_.sort_values()
-            self.y = self.tasks[0].y[self.filenames_.index].reset_index(drop=True)
-            self.x = self.tasks[0].x.loc[self.filenames_.index].reset_index(drop=True)
-            for i, task in enumerate(self.tasks[1:]):
+            xs, ys = [], []
+            for i, task in enumerate(self.tasks):
                 task.load_csv(keep_first_10_pc)
                 # forcing the order of the files to be the same
-                y = task.y[task.filenames_.sort_values().index].reset_index(drop=True)
-                x = task.x.loc[task.filenames_.sort_values().index].reset_index(
-                    drop=True
-                )
-                x.rename(columns=lambda x: str(i) + "_" + x, inplace=True)
-                assert np.all(y.values == self.y.values), "Labels must match"
-                self.x = pd.concat([self.x, x], axis=1, join="inner")
+                order = np.argsort(task.filenames_.to_numpy())
+                x = task.x.iloc[order].reset_index(drop=True)
+                if i > 0:
+                    x.columns = str(i - 1) + "_" + x.columns
+                xs.append(x)
+                ys.append(task.y.to_numpy()[order])
+                if i == 0:
+                    self.filenames_ = task.filenames_.iloc[order]
+                    self.y = task.y.iloc[order].reset_index(drop=True)
+            assert all(np.all(y == ys[0]) for y in ys[1:]), "Labels must match"
+            self.x = pd.concat(xs, axis=1, join="inner", copy=False)
             if not keep_first_10_pc:
                 self.name += "-no-pc"
             self.__loaded = True
 
+    @property
+    def loaded(self) -> bool:
+        return self.__loaded
+
     def get_csv_path(self):
         raise NotImplementedError("ConcatTask doesn't have a single CSV file")
 
@@ -609,14 +963,139 @@ concat_tasks = [
 ]
 
 
-def load_task_csvs(tasks, keep_first_10_pc):
-    # 1. load all csv files
-    for t in track(tasks, description="Loading CSV files"):
-        try:
-            t.load_csv(keep_first_10_pc)
-        except FileNotFoundError:
-            print(t.name, "not found")
+class TaskRegistry:
+    """
+    The combinations of datasets, extensions and feature sets that make a task. They
+    are computed the first time they are needed; `all` and `filter` return new Task
+    objects, not loaded, so that loading them doesn't alter the registry.
+    """
+
+    @functools.cached_property
+    def combinations(self) -> List[Tuple[Dataset, FeatureSet, str]]:
+        return [
+            (d, f, e)
+            for d in datasets
+            for e in d.extensions
+            for f in feature_sets
+            if f.accepts(e) and ("-harm" not in f.name or d.accept_harm)
+        ]
+
+    @property
+    def all(self) -> List[Task]:
+        return self.filter()
+
+    def filter(
+        self, dataset: Optional[str] = None, extension: Optional[str] = None
+    ) -> List[Task]:
+        """
+        Returns the tasks of a dataset (friendly name) and/or an extension; None
+        matches everything.
+        """
+        return [
+            Task(d, f, e)
+            for d, f, e in self.combinations
+            if (dataset is None or d.friendly_name == dataset)
+            and (extension is None or e == extension)
+        ]
+
+
+registry = TaskRegistry()
+
+
+def common_filenames(tasks: List[Task]) -> Dict[Tuple[str, str], pd.Index]:
+    """
+    Computes, for each dataset (friendly name) and extension, the filenames shared
+    by all the loaded tasks.
+
+    Parameters:
+    tasks (List[Task]): The tasks, which must all have been loaded.
+
+    Returns:
+    Dict[Tuple[str, str], pd.Index]: The common filenames, keyed by
+    `(dataset.friendly_name, extension)`.
+    """
+    groups = defaultdict(list)
+    for task in tasks:
+        assert task.loaded, f"Task {task.name} must be loaded before intersecting"
+        if not hasattr(task, "x"):
             continue
+        # the categories are the filenames without duplicates, already hashed
+        groups[(task.dataset.friendly_name, task.extension)].append(
+            task.filenames_.cat.categories
+        )
+    return {k: functools.reduce(pd.Index.intersection, v) for k, v in groups.items()}
+
+
+def _load_task_csv(task: Task, keep_first_10_pc: bool) -> Task:
+    """
+    Loads the csv file of a task and returns the task, so that it can be run in a
+    sub-process.
+    """
+    try:
+        task.load_csv(keep_first_10_pc)
+    except FileNotFoundError:
+        print(task.name, "not found")
+    return task
+
+
+def _load_task_group(tasks: List[Task], keep_first_10_pc: bool) -> List[Task]:
+    """
+    Loads the csv files of tasks sharing the same csv file, which is read only once,
+    and returns the tasks, so that it can be run in a sub-process.
+    """
+    tasks = [_load_task_csv(t, keep_first_10_pc) for t in tasks]
+    _last_read.rows.clear()
+    return tasks
+
+
+def load_task_csvs(tasks, keep_first_10_pc, njobs=None, threads=None):
+    """
+    Loads the csv files of the tasks. If `njobs` is not 1, the files are loaded by
+    `njobs` processes (or threads, if `threads` is True; default:
+    `settings.LOADING_THREADS`) in parallel (-1 means one per virtual core; default:
+    `settings.LOADING_JOBS`, since every worker holds a whole csv file in RAM) and the
+    tasks in the list are replaced by the loaded ones. Tasks reading the same csv
+    file are loaded by the same worker, so that the file is read once.
+    """
+    if njobs is None:
+        njobs = S.LOADING_JOBS
+    if threads is None:
+        threads = S.LOADING_THREADS
+    if njobs == 1:
+        for t in track(tasks, description="Loading CSV files"):
+            _load_task_csv(t, keep_first_10_pc)
+        _last_read.rows.clear()
+        return
+
+    groups = defaultdict(list)
+    for i, t in enumerate(tasks):
+        groups[(t.dataset.friendly_name, t.get_csv_path())].append(i)
+    groups = list(groups.values())
+
+    max_workers = os.cpu_count() if njobs == -1 else njobs
+    # threads don't need to send the loaded data back, but only the pyarrow csv
+    # parser and numpy release the GIL
+    executor_cls = ThreadPoolExecutor if threads else ProcessPoolExecutor
+    # pandas options are global: with threads, copy-on-write (used while cleaning)
+    # is set for the whole loading, so that the threads don't restore it for each
+    # other
+    if threads:
+        options = pd.option_context("mode.copy_on_write", True)
+    else:
+        options = contextlib.nullcontext()
+    progress = Progress(refresh_per_second=4)
+    with options, progress, executor_cls(max_workers=max_workers) as executor:
+        bar = progress.add_task("Loading CSV files", total=len(tasks))
+        loaded = executor.map(
+            _load_task_group,
+            [[tasks[i] for i in group] for group in groups],
+            repeat(keep_first_10_pc),
+        )
+        # the bar is advanced by the main process, once per group of tasks
+        for group, group_tasks in zip(groups, loaded):
+            for i, t in zip(group, group_tasks):
+                tasks[i] = t
+            progress.advance(bar, len(group))
 
 
 def load_tasks(keep_first_10_pc):
@@ -651,21 +1130,15 @@ def load_tasks(keep_first_10_pc):
         return tasks
 
     # create tasks
-    tasks = [
-        Task(d, f, e)
-        for d in datasets
-        for e in d.extensions
-        for f in feature_sets
-        if f.accepts(e)
-        and ("-harm" not in f.name or ("-harm" in f.name and d.accept_harm))
-    ]
+    tasks = registry.all
 
     # 1. load all csv files
     load_task_csvs(tasks, keep_first_10_pc)
 
     # 2. use the other csv files to create the intersection
+    common = common_filenames(tasks)
     for t in tasks:
-        t.intersect(tasks)
+        t.intersect(common[(t.dataset.friendly_name, t.extension)])
 
     # 3. adding concat tasks
     concat_tasks_ = []
@@ -685,8 +1158,9 @@ def load_tasks(keep_first_10_pc):
                     concat_tasks_.append(ConcatTask(to_concat))
     logger.info(f"{len(concat_tasks_)} concat tasks created")
 
-    # 4. load concat tasks
-    load_task_csvs(concat_tasks_, keep_first_10_pc)
+    # 4. load concat tasks; they share the data of the tasks loaded above, which
+    # would be duplicated if they were sent to sub-processes
+    load_task_csvs(concat_tasks_, keep_first_10_pc, njobs=1)
     tasks += concat_tasks_
 
     logger.info(f"{len(tasks)} tasks loaded")
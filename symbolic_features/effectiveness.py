@@ -4,53 +4,29 @@ from dataclasses import dataclass
 
 import autosklearn.metrics
 import numpy as np
+import pandas as pd
 import plotly.express as px
 from autosklearn.estimators import AutoSklearnClassifier
 from joblib import Parallel, delayed
-from rich.progress import track
-from sklearn.dummy import DummyClassifier
-from sklearn.model_selection import StratifiedKFold, cross_validate
+from sklearn.model_selection import StratifiedKFold
 
 from . import settings as S
-from .data import Task, load_tasks
+from .data import Task, load_tasks, read_csv
 from .utils import AbstractMain, logger, plotly_save
 
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
 
-def random_guessing(task, splitter):
+
+def random_guessing(task):
     """
-    Run each of the dummy strategies a given number of times and return the
-    maximum value.
+    Return the expected balanced accuracy of the dummy strategies (most frequent,
+    stratified and uniform), which is 1 / number of classes for all of them: there
+    is no need to fit them.
     """
-    strategies = ["most_frequent", "stratified", "uniform"]
-
-    if splitter is None:
-        splitter = 5
-
-    def compute_scores(idx, strategy_name, task, splitter):
-        strategy = DummyClassifier(strategy=strategy_name, random_state=idx)
-        scores = cross_validate(
-            estimator=strategy,
-            X=task.x,
-            y=task.y,
-            cv=splitter,
-            scoring=["balanced_accuracy"],
-            return_train_score=False,
-        )
-        return strategy_name, scores["test_balanced_accuracy"].mean()
-
-    scores = Parallel(n_jobs=-1)(
-        delayed(compute_scores)(idx, strategy_name, task, splitter)
-        for strategy_name, idx in track(
-            zip(
-                strategies * S.DUMMY_TRIALS,
-                range(len(strategies * S.DUMMY_TRIALS)),
-            ),
-            description="Dummy strategies",
-        )
-    )
-
-    scores = [np.mean([v for k_, v in scores if k_ == k]) for k in strategies]
-    return max(scores)
+    return 1 / task.y.nunique()
 
 
 def plot_time_performance(performance_data, fname=None):
@@ -68,15 +44,15 @@ def plot_time_performance(performance_data, fname=None):
     return fig
 
 
-def automl(task: Task, keep_first_10_pc, splitter=None, automl_time=3600, output=None):
+def automl(task: Task, keep_first_10_pc, splitter=None, automl_time=3600, output=None, n_jobs=-1, debug=False):
     """
     Apply AutoSklearn to a task and saves csv of the optimization if output is not
-    None
+    None. `n_jobs` is the number of processes used by AutoSklearn.
     """
     logger.info("------------------------------")
     logger.info("------------------------------")
     logger.info(f"Starting AutoML on {task.name}")
-    if S.DEBUG:
+    if debug:
         smac_scenario_args = None  # {"runcount_limit": 2}
         metalearning = 25
         automl_time = 300
@@ -90,7 +66,7 @@ def automl(task: Task, keep_first_10_pc, splitter=None, automl_time=3600, output
 
     assert task.x.shape[0] > 2 * S.SPLITS, "Not enough data in x"
     assert task.x.shape[0] == task.y.shape[0], "X and y have different shapes"
-    random_guess = random_guessing(task, splitter)
+    random_guess = random_guessing(task)
     logger.info(f"Random Guessing: {random_guess}")
 
     classifier = AutoSklearnClassifier(
@@ -98,7 +74,7 @@ def automl(task: Task, keep_first_10_pc, splitter=None, automl_time=3600, output
         time_left_for_this_task=automl_time,
         initial_configurations_via_metalearning=metalearning,
         smac_scenario_args=smac_scenario_args,
-        n_jobs=-1,
+        n_jobs=n_jobs,
         memory_limit=10000,
         ensemble_nbest=10,
         metric=autosklearn.metrics.balanced_accuracy,
@@ -109,20 +85,56 @@ def automl(task: Task, keep_first_10_pc, splitter=None, automl_time=3600, output
     acc = classifier.performance_over_time_["ensemble_optimization_score"].max()
     logger.info(f"Balanced accuracy: {acc:.2e}")
     if output is not None:
-        classifier.performance_over_time_.to_csv(output)
+        pot = classifier.performance_over_time_
+        # write and rename, so that an interrupted run doesn't leave a partial file
+        if pa is not None:
+            # typed copy, faster to read when plotting; written first, so that it
+            # is complete when the csv exists
+            parquet = os.path.splitext(output)[0] + ".parquet"
+            pot.to_parquet(parquet + ".tmp", engine="pyarrow")
+            os.replace(parquet + ".tmp", parquet)
+        pot.to_csv(output + ".tmp")
+        os.replace(output + ".tmp", output)
 
     return classifier.performance_over_time_
 
 
+def resample_max(pot, step=np.timedelta64(100, "ms")):
+    """
+    Resample the optimization scores of `pot` (with `Timestamp` starting from 0) to a
+    frequency of `step`, taking the max of each bin (closed on the right) and
+    forward-filling the empty ones, as
+    `pot.set_index("Timestamp").resample(step, closed="right").max().ffill()`
+    does, but without pandas' resampling machinery.
+    """
+    ns = pot["Timestamp"].to_numpy().view("i8")
+    step = step.astype("timedelta64[ns]").view("i8")
+    # bin (k-1, k] * step is labeled k * step; as pandas, a bin is added after the
+    # last timestamp if it falls on an edge
+    bins = -(-ns // step)
+    first = bins.min()
+    scores = np.full(ns.max() // step - first + 2, np.nan)
+    np.fmax.at(scores, bins - first, pot["ensemble_optimization_score"].to_numpy())
+    # forward fill: index of the last non-empty bin
+    last_valid = np.where(np.isnan(scores), 0, np.arange(scores.shape[0]))
+    scores = scores[np.maximum.accumulate(last_valid)]
+    return pd.DataFrame(
+        {
+            "Timestamp": pd.to_timedelta((first + np.arange(scores.shape[0])) * step),
+            "ensemble_optimization_score": scores,
+        }
+    )
+
+
 def add_task_result(performances, pot, task):
     """
     Add the result of an automl (pot=performance_over_time_) to the dict `performences`
     """
-    # select columns
-    pot = pot[["Timestamp", "ensemble_optimization_score"]]
-    # time start from 0
-    pot_copy = pot.copy()  # to avoid pandas warnings...
-    pot_copy["Timestamp"] = pot["Timestamp"] - pot["Timestamp"].min()
+    # select columns and make time start from 0 (assign returns a new frame, no
+    # pandas warnings)
+    pot_copy = pot[["Timestamp", "ensemble_optimization_score"]].assign(
+        Timestamp=pot["Timestamp"] - pot["Timestamp"].min()
+    )
     # store data
     dataset_key = task.dataset.friendly_name + "-" + task.extension[1:]  # no dot
     if dataset_key in performances:
@@ -137,6 +149,7 @@ class Main(AbstractMain):
     debug: bool = False
     keep_first_10_pc: bool = False
     automl_time: int = 1800
+    parallel_tasks: int = 1
 
     def classification(
         self, featureset: str = None, dataset: str = None, extension: str = None
@@ -146,6 +159,7 @@ class Main(AbstractMain):
             __import__("ipdb").set_trace()
         splitter = StratifiedKFold(S.SPLITS, random_state=42, shuffle=True)
 
+        tasks = []
         for task in load_tasks(self.keep_first_10_pc):
             # skipping tasks not matching the filters
             if featureset is not None and featureset != task.feature_set.name:
@@ -154,48 +168,89 @@ class Main(AbstractMain):
                 continue
             if extension is not None and extension not in task.extension:
                 continue
-            if os.path.exists(task.name + ".csv"):
+            tasks.append(task)
+
+        # `parallel_tasks` tasks are run at the same time, the cores are split among
+        # them
+        n_jobs = max(1, os.cpu_count() // self.parallel_tasks)
+        Parallel(n_jobs=self.parallel_tasks)(
+            delayed(self._classify_task)(task, splitter, n_jobs) for task in tasks
+        )
+
+    def _classify_task(self, task, splitter, n_jobs):
+        output = task.name + ".csv"
+
+        def done():
+            return os.path.exists(output) and os.path.getsize(output) > 0
+
+        try:
+            if done():
                 logger.info(f"Skipping {task.name}, already done")
-                continue
-            automl(task, self.keep_first_10_pc, splitter, S.AUTOML_TIME, output=task.name + ".csv")
+                return
+            # the lock file allows running more processes (or machines sharing this
+            # directory) on the same tasks
+            lock = task.name + ".lock"
+            try:
+                open(lock, "x").close()
+            except FileExistsError:
+                logger.info(
+                    f"Skipping {task.name}, locked by another process (remove {lock} if none is running)"
+                )
+                return
+            try:
+                # checked again: another process may have completed the task (and
+                # released the lock) after the first check
+                if done():
+                    logger.info(f"Skipping {task.name}, already done")
+                    return
+                # options are passed explicitly: the workers of `classification`
+                # import `settings` again, without the values set by this object
+                automl(
+                    task,
+                    self.keep_first_10_pc,
+                    splitter,
+                    self.automl_time,
+                    output=output,
+                    n_jobs=n_jobs,
+                    debug=self.debug,
+                )
+            finally:
+                os.remove(lock)
+        finally:
+            # only the data of the task being evaluated are needed from now on,
+            # skipped tasks included
+            task.unload()
 
     def plot_performances(self):
-        import pandas as pd
-
         performances = {}
         for task in load_tasks(self.keep_first_10_pc):
             try:
-                pot = pd.read_csv(task.name + ".csv")
+                if pa is not None and os.path.exists(task.name + ".parquet"):
+                    pot = pd.read_parquet(task.name + ".parquet")
+                else:
+                    # with pyarrow, timestamps are already parsed while reading
+                    pot = read_csv(task.name + ".csv")
             except FileNotFoundError:
                 logger.warning(f"File {task.name}.csv not found")
                 continue
 
-            try:
-                pot["Timestamp"] = pd.to_datetime(pot["Timestamp"])
-            except Exception as e:
-                logger.warning(f"Error converting Timestamp to datetime: {e}")
+            if not pd.api.types.is_datetime64_any_dtype(pot["Timestamp"]):
+                try:
+                    pot["Timestamp"] = pd.to_datetime(pot["Timestamp"])
+                except Exception as e:
+                    logger.warning(f"Error converting Timestamp to datetime: {e}")
 
             add_task_result(performances, pot, task)
 
         # plotting the performances over time
         for plot_name, dfs in performances.items():
-            # Resample the data to a common frequency (every minute)
-            for k in dfs:
-                dfs[k] = (
-                    dfs[k]
-                    .set_index("Timestamp")
-                    .resample("100ms", closed="right")
-                    .max()
-                    .ffill()
-                    .reset_index()
-                )
-
+            # Resample the data to a common frequency (every 100ms)
             for k in dfs:
-                dfs[k]["Timestamp"] = (
-                    dfs[k]["Timestamp"]
-                    .dt.total_seconds()
-                    .astype(int)
-                    .apply(lambda x: str(datetime.timedelta(seconds=x)))
+                dfs[k] = resample_max(dfs[k])
+                # formatting each distinct second once, not each 100ms row
+                seconds = dfs[k]["Timestamp"].dt.total_seconds().astype(int)
+                dfs[k]["Timestamp"] = seconds.map(
+                    {s: str(datetime.timedelta(seconds=int(s))) for s in seconds.unique()}
                 )
 
             fig = px.line()
@@ -1,11 +1,18 @@
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
 
-import chardet
 import numpy as np
-import pandas as pd
 
-from .utils import AbstractMain, benchmark_command, logger, telegram_notify
+from .utils import (
+    AbstractMain,
+    benchmark_command,
+    count_csv_rows,
+    count_files,
+    detect_encoding,
+    logger,
+    telegram_notify,
+)
 
 
 @dataclass
@@ -19,6 +26,7 @@ class Main(AbstractMain):
     output: str = "features/"
     n_trials_extraction: int = 2
     extension: str = ".mid"
+    parallel_datasets: bool = False
 
     def _log_info(
         self, n_midi_files, max_ram, avg_ram, sum_times, avg_time, sum_rtimes, avg_rtime
@@ -33,45 +41,75 @@ class Main(AbstractMain):
         logger.info("_____________")
         return max_ram, avg_ram, sum_times, avg_time, sum_rtimes, avg_rtime
 
+    def _extract_dataset(self, dataset, n_music_scores, feature_set, stdout, stderr):
+        """
+        Runs the extractor on a dataset, returns the RAM sequence and the seconds
+        covered by each of its samples, the real time and the CPU time, and the
+        errors, or None if the dataset is skipped
+        """
+        dataset = Path(dataset)
+        output = Path(self.output) / dataset.name
+        output.mkdir(parents=True, exist_ok=True)
+        if n_music_scores[str(dataset)] == 0:
+            # skip datasets that have no files with this extension
+            return None
+        if '-harm' in feature_set:
+            # skip datasets that have no musescore files
+            if not (dataset / 'musescore').exists():
+                return None
+        logger.info(f"Using {feature_set} on {dataset} extension {self.extension}")
+        cmd = self._get_cmd(feature_set, dataset, output)
+        ram_sequence, real_time, cpu_time, ram_durations = benchmark_command(
+            cmd, stdout=stdout, stderr=stderr
+        )
+
+        fname = self._get_csv_name(feature_set, output).with_suffix(".csv")
+        try:
+            n_converted = count_csv_rows(fname)
+        except UnicodeDecodeError:
+            # not utf-8
+            n_converted = count_csv_rows(fname, encoding=detect_encoding(fname))
+        n_errors = n_music_scores[str(dataset)] - n_converted
+        errors = {
+            "n_errors": n_errors,
+            "ratio_errors": n_errors / n_music_scores[str(dataset)],
+            "cpu_time": cpu_time,
+            "clock_time": real_time,
+        }
+        return ram_sequence, ram_durations, real_time, cpu_time, errors
+
     def _extract_trial(self, n_music_scores, feature_set):
         ram_stats = []
+        ram_durations = []
         cpu_times = []
         real_times = []
         errored = {}
-        for dataset in self.datasets.values():
-            dataset = Path(dataset)
-            output = Path(self.output) / dataset.name
-            output.mkdir(parents=True, exist_ok=True)
-            if n_music_scores[str(dataset)] == 0:
-                # skip datasets that have no files with this extension
-                continue
-            if '-harm' in feature_set:
-                # skip datasets that have no musescore files
-                if not (dataset / 'musescore').exists():
-                    continue
-            logger.info(f"Using {feature_set} on {dataset} extension {self.extension}")
-            cmd = self._get_cmd(feature_set, dataset, output)
-            ram_sequence, real_time, cpu_time = benchmark_command(
-                cmd,
-                stdout=open(feature_set + "_output.txt", "wt"),
-                stderr=open(feature_set + "_errs.txt", "wt"),
+        # opened once per trial, so that the output of every dataset is kept
+        with open(feature_set + "_output.txt", "wt") as stdout, open(
+            feature_set + "_errs.txt", "wt"
+        ) as stderr, ThreadPoolExecutor(
+            # with parallel datasets, the RAM and times are still measured per
+            # dataset, but the datasets compete for the cores
+            max_workers=len(self.datasets) if self.parallel_datasets else 1
+        ) as executor:
+            results = executor.map(
+                lambda dataset: self._extract_dataset(
+                    dataset, n_music_scores, feature_set, stdout, stderr
+                ),
+                self.datasets.values(),
             )
-            ram_stats += ram_sequence
-            cpu_times.append(cpu_time)
-            real_times.append(real_time)
-
-            fname = self._get_csv_name(feature_set, output).with_suffix(".csv")
-            enc = chardet.detect(open(fname, "rb").read())["encoding"]
-            n_converted = pd.read_csv(fname, encoding=enc).shape[0]
-            n_errors = n_music_scores[str(dataset)] - n_converted
-            errored[str(dataset)] = {
-                "n_errors": n_errors,
-                "ratio_errors": n_errors / n_music_scores[str(dataset)],
-                "cpu_time": cpu_time,
-                "clock_time": real_time,
-            }
-
-        avg_ram = np.mean(ram_stats)
+            for dataset, result in zip(self.datasets.values(), results):
+                if result is None:
+                    continue
+                ram_sequence, durations, real_time, cpu_time, errors = result
+                ram_stats += ram_sequence
+                ram_durations += durations
+                cpu_times.append(cpu_time)
+                real_times.append(real_time)
+                errored[str(Path(dataset))] = errors
+
+        # each sample weighted by the time it covers
+        avg_ram = np.average(ram_stats, weights=ram_durations)
         avg_time = sum(cpu_times) / n_music_scores["tot"]
         avg_rtime = sum(real_times) / n_music_scores["tot"]
         max_ram = max(ram_stats)
@@ -143,21 +181,21 @@ class Main(AbstractMain):
             ]
 
     def _extract_multiple_trials(self, n_files, feature_set):
-        stats = []
+        # one row per trial, one column per statistic returned by `_log_info`
+        stats = np.empty((self.n_trials_extraction, 6))
         for i in range(self.n_trials_extraction):
             logger.info(f"Trial number {i+1}")
-            stat, errors = self._extract_trial(n_files, feature_set)
-            stats.append(stat)
+            stats[i], errors = self._extract_trial(n_files, feature_set)
 
         logger.info("_____________")
         logger.info("Number of errors  and time per dataset:")
         logger.info(errors)
         logger.info(f"Statistics out of {self.n_trials_extraction} trials")
         logger.info("Averages:")
-        stats_avg = np.mean(stats, axis=0)
+        stats_avg = stats.mean(axis=0)
         self._log_info(n_files, *stats_avg)
         logger.info("Std (1 ddof):")
-        stats_std = np.std(stats, axis=0, ddof=1)
+        stats_std = stats.std(axis=0, ddof=1)
         self._log_info(n_files, *stats_std)
 
     # @logger.catch
@@ -168,11 +206,13 @@ class Main(AbstractMain):
             if self.extension in [".xml", ".musicxml", ".mxl"]
             else [self.extension]
         )
-        for p in self.datasets.values():
-            p = Path(p)
-            n_files[str(p)] = sum(
-                1 for ext in extensions for f in p.glob(f"**/*{ext}") if f.is_file()
-            )
+        datasets = [Path(p) for p in self.datasets.values()]
+        # one walk per dataset, all the datasets at the same time (scandir releases
+        # the GIL)
+        with ThreadPoolExecutor() as executor:
+            counts = executor.map(lambda p: count_files(p, extensions), datasets)
+            for p, n in zip(datasets, counts):
+                n_files[str(p)] = n
         n_files["tot"] = sum(n_files.values())
         self._extract_multiple_trials(n_files, feature_set)
 
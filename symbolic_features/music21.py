@@ -1,4 +1,6 @@
+import functools
 import itertools
+import os
 from pathlib import Path
 
 import numpy as np
@@ -8,19 +10,31 @@ from music21.features.base import allFeaturesAsList, extractorsById
 from tqdm import tqdm
 
 
+# ids of the extractors, in the order used by `allFeaturesAsList`; computed once per
+# process instead of once per file
+COLUMNS = [x.id for x in extractorsById("all")] + ["FileName"]
+
+
+@functools.lru_cache(maxsize=None)
+def column_keys(col, n):
+    """
+    Names of the `n` values of the feature `col`; built once and shared by the
+    dictionaries of all the files
+    """
+    return tuple(f"{col}_{i}" for i in range(n))
+
+
 def extract(file):
     features = allFeaturesAsList(file)
     features.append([file])
-    columns = [x.id for x in extractorsById("all")]
-    columns.append("FileName")
     return {
-        columns[outer] + f"_{i}": f
-        for outer in range(len(columns))
-        for i, f in enumerate(features[outer])
+        key: f
+        for col, values in zip(COLUMNS, features)
+        for key, f in zip(column_keys(col, len(values)), values)
     }
 
 
-def main(dir: str, ext: str, output: str, njobs: int = -1):
+def main(dir: str, ext: str, output: str, njobs: int = -1, batch: int = 1024):
     """
     Args:
         dir : directory of the dataset
@@ -31,6 +45,8 @@ def main(dir: str, ext: str, output: str, njobs: int = -1):
         output : output path of the csv file; extension is added if it's not '.csv'
         njobs : number of processes that will be used; -1 means all virtual cores, 1 means
         no parallel processing
+        batch : number of files whose features are kept as dictionaries before
+            being collected in a DataFrame, which takes much less RAM
     """
 
     musicxml_exts = [".xml", ".mxl", ".musicxml"]
@@ -41,16 +57,30 @@ def main(dir: str, ext: str, output: str, njobs: int = -1):
             exts = [ext]
     else:
         exts = ext
+    # one walk for all the extensions (including hidden files and directories, as
+    # `Path.glob`), files grouped by extension; the extensions are matched ignoring
+    # the case, as when counting the files in `features.py`
+    files = {ext: [] for ext in exts}
+    for root, _, fnames in os.walk(dir):
+        for fname in fnames:
+            for ext in exts:
+                if fname.lower().endswith(ext.lower()):
+                    files[ext].append(Path(root) / fname)
+                    break
+    files = list(itertools.chain.from_iterable(files.values()))
+    # a single pool for all the extensions and batches
     features = []
-    for ext in exts:
-        files = list(Path(dir).glob("**/*" + ext)) # we should check if it's a file!
-        features += Parallel(n_jobs=njobs)(
-            delayed(extract)(file) for file in tqdm(files)
-        )
-
-    pd.DataFrame(features).to_csv(
-        Path(output).with_suffix(".csv"), index=False
-    )
+    with Parallel(n_jobs=njobs) as parallel, tqdm(total=len(files)) as pbar:
+        for start in range(0, len(files), batch):
+            chunk = files[start : start + batch]
+            features.append(
+                pd.DataFrame(parallel(delayed(extract)(file) for file in chunk))
+            )
+            pbar.update(len(chunk))
+
+    # columns are aligned across batches as they were across files
+    features = pd.concat(features, ignore_index=True) if features else pd.DataFrame()
+    features.to_csv(Path(output).with_suffix(".csv"), index=False)
 
 
 if __name__ == "__main__":
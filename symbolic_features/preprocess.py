@@ -1,16 +1,39 @@
+import os
 import shutil
 import subprocess
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
 
 from .utils import AbstractMain, logger, telegram_notify
 
+# characters replaced by `fix_invalid_filenames`
+INVALID_CHARS = str.maketrans({",": "_", ";": "_", " ": "_"})
+
+
+def find_files(path, extensions):
+    """
+    Returns a dictionary mapping each of `extensions` to the list of files in `path`
+    (recursively) with that extension, walking the tree only once. As `Path.glob`,
+    hidden files and directories are included.
+    """
+    files = {ext: [] for ext in extensions}
+    for root, _, fnames in os.walk(path):
+        for fname in fnames:
+            # `splitext` would miss names made of the extension only, e.g. `.xml`
+            for ext in extensions:
+                if fname.endswith(ext):
+                    files[ext].append(Path(root) / fname)
+                    break
+    return files
+
 
 @dataclass
 class Main(AbstractMain):
     datasets: dict = None
     conversion_timeout: float = 120
+    conversion_jobs: int = os.cpu_count()
     mscore_exe: str = None
     hum2mid: str = Path("humdrum-tools") / "humextra" / "bin" / "hum2mid"
 
@@ -20,59 +43,69 @@ class Main(AbstractMain):
         Fix invalid names containing , ; and space. Invalid names are renamed, so they
         will no longer exist.
         """
+        extensions = (".xml", ".musicxml", ".mxl", ".mid", ".krn")
         for dataset in self.datasets.values():
-            dataset = Path(dataset)
-            for ext in ["xml", "musicxml", "mxl", "mid", "krn"]:
-                for file in dataset.glob(f"**/*.{ext}"):
-                    if any(char in file.name for char in [",", ";"]):
-                        new_name = str(file).replace(",", "_")
-                        new_name = new_name.replace(";", "_")
-                        new_name = new_name.replace(" ", "_")
-                        logger.info(f"Renaming {file} -> {new_name}")
-                        Path(new_name).parent.mkdir(parents=True, exist_ok=True)
-                        file.rename(new_name)
+            # collected before renaming
+            files = [
+                file
+                for ext_files in find_files(dataset, extensions).values()
+                for file in ext_files
+                if "," in file.name or ";" in file.name
+            ]
+            for file in files:
+                new_name = str(file).translate(INVALID_CHARS)
+                logger.info(f"Renaming {file} -> {new_name}")
+                Path(new_name).parent.mkdir(parents=True, exist_ok=True)
+                file.rename(new_name)
+
+    @logger.catch
+    def _convert(self, cmd, file):
+        logger.info(f"Converting {file} to MIDI")
+        try:
+            subprocess.run(
+                cmd,
+                stderr=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                timeout=self.conversion_timeout,
+            )
+        except subprocess.TimeoutExpired:
+            logger.warning(
+                f"Continuing because time expired for file {file}! Try running:\n"
+                + "".join(cmd)
+            )
 
     @logger.catch
     def convert2midi(self):
         """
-        Add a midi file for each musicxml or kern file
+        Add a midi file for each musicxml or kern file, running
+        `conversion_jobs` conversions at a time
         """
-        for dataset in self.datasets.values():
-            if "didone" in str(dataset):
-                to_remove = Path(dataset) / "midi"
-                if to_remove.exists():
-                    shutil.rmtree(to_remove)
-
-            for ext in ["xml", "musicxml", "mxl", "krn"]:
-                for file in Path(dataset).glob(f"**/*.{ext}"):
-                    if file.with_suffix(".mid").exists():
-                        logger.info(f"{file} already exists as MIDI, skipping it!")
-                        continue
-
-                    if ext == "krn":
-                        cmd = [
-                            self.hum2mid,
-                            file,
-                            "-CIPT",
-                            "-o",
-                            file.with_suffix(".mid"),
-                        ]
-                    else:
-                        cmd = [self.mscore_exe, "-fo", file.with_suffix(".mid"), file]
-
-                    logger.info(f"Converting {file} to MIDI")
-                    try:
-                        subprocess.run(
-                            cmd,
-                            stderr=subprocess.DEVNULL,
-                            stdout=subprocess.DEVNULL,
-                            timeout=self.conversion_timeout,
-                        )
-                    except subprocess.TimeoutExpired:
-                        logger.warning(
-                            f"Continuing because time expired for file {file}! Try running:\n"
-                            + "".join(cmd)
-                        )
+        # threads are enough, the conversions run in mscore/hum2mid processes
+        with ThreadPoolExecutor(max_workers=self.conversion_jobs) as executor:
+            for dataset in self.datasets.values():
+                if "didone" in str(dataset):
+                    to_remove = Path(dataset) / "midi"
+                    if to_remove.exists():
+                        shutil.rmtree(to_remove)
+
+                # files with the same name and different extension are converted
+                # once, as the MIDI file doesn't exist yet while converting
+                submitted = set()
+                files = find_files(dataset, [".xml", ".musicxml", ".mxl", ".krn"])
+                for ext, ext_files in files.items():
+                    for file in ext_files:
+                        mid = file.with_suffix(".mid")
+                        if mid in submitted or mid.exists():
+                            logger.info(f"{file} already exists as MIDI, skipping it!")
+                            continue
+
+                        if ext == ".krn":
+                            cmd = [self.hum2mid, file, "-CIPT", "-o", mid]
+                        else:
+                            cmd = [self.mscore_exe, "-fo", mid, file]
+
+                        submitted.add(mid)
+                        executor.submit(self._convert, cmd, file)
 
     # @logger.catch
     # def musicxml2mxl(self):
@@ -10,6 +10,21 @@ JSYMBOLIC_JAR = "./tools/jSymbolic_2_2_user/jSymbolic2.jar"
 # path to musescore executable (could be /usr/bin/mscore, but version 3.6.2 is recommended)
 MSCORE_EXE = "/home/federico/bin/MuseScore-3.6.2.548021370-x86_64.AppImage"
 
+# encoding of the csv files with the extracted features; if None, utf-8 is tried and
+# the encoding is detected if it fails
+ENCODING = None
+
+# load the csv files with threads instead of processes; faster if pyarrow is
+# installed, since the loaded data is not sent back from the sub-processes
+LOADING_THREADS = False
+
+# number of csv files loaded in parallel; each worker holds the data of a whole csv
+# file, so the peak RAM grows with it: raise it (-1 means one per virtual core) if
+# the RAM allows
+LOADING_JOBS = 4
+
+# number of rows read at a time when loading the extracted features
+CHUNKSIZE = 200_000
+
 SPLITS = 10
 AUTOML_TIME = 1800
-DUMMY_TRIALS = 1000
@@ -1,15 +1,30 @@
 import json
+import os
+import select
 import sys
 import time
-from dataclasses import asdict, dataclass
+from dataclasses import dataclass, fields
 from pathlib import Path
 
 import notifiers
+import pandas as pd
 from loguru import logger
-from psutil import NoSuchProcess, Popen
+from psutil import NoSuchProcess, Popen, TimeoutExpired
 
 from . import settings as S
 
+try:
+    # faust-cchardet is a faster C implementation with the same interface
+    from cchardet import UniversalDetector
+except ImportError:
+    from chardet.universaldetector import UniversalDetector
+
+try:
+    import pyarrow as pa
+    from pyarrow import csv as pacsv
+except ImportError:
+    pa = pacsv = None
+
 logger.remove()
 logger.add(
     sys.stdout, format="{time:YYYY-MM-DD HH:mm:ss}: <lvl>{message}</lvl>", level="INFO"
@@ -42,28 +57,42 @@ class AbstractMain:
     """
 
     def __post_init__(self):
-        for name, value in asdict(self).items():
+        # `fields` doesn't deep-copy the values as `asdict` does
+        for field in fields(self):
+            name = field.name
+            value = getattr(self, name)
             if value is not None:
                 setattr(S, name.upper(), value)
             else:
                 setattr(self, name, getattr(S, name.upper(), None))
 
 
-def benchmark_command(*popen_args, hook=None, **popen_kwargs):
+def benchmark_command(*popen_args, hook=None, max_interval=10, **popen_kwargs):
     """
     Given the arguments to run a sub-process, this function runs it and benchmarks the
     cpu time (user + system), the total time, and the RAM used by the sub-process and
     all its children (recursively).
     It optionally run a function (e.g. to stop the process in certain conditions).
 
+    The process is sampled every second at first, then the interval grows by 20% at
+    each sample up to `max_interval` seconds; since the samples are not evenly spaced,
+    the time elapsed from each sample to the next one (or to the end of the process)
+    is returned as well, to be used as weight of the sample (e.g. for the average
+    RAM).
+    The children are looked up at every sample; the cpu time of the children that
+    exited is the one of their last sample.
+
     Args
     ---
 
     *popen_args : any argument for `psutil.Popen`
+    max_interval : maximum number of seconds between two samples
     hook : a Callable, accepting the following arguments:
         popen : the `psutil.Poepn` object
         children : list of `psutil.Process` referred to the children of the sub-process
-        ram_sequence : list of RAM used by the sub-process and all its children
+        ram_sequence : list of RAM (MB) used by the sub-process and all its
+            children, one value per previous sample; the samples are not evenly
+            spaced in time (see above)
         cpu_times : dictionary with the CPU time taken by the sub-process (key: 'main')
             and all its children (key: PID)
         start_time : time in seconds in which the sub-process was started
@@ -82,14 +111,33 @@ def benchmark_command(*popen_args, hook=None, **popen_kwargs):
 
     benchmark_command(['echo', 'ciao'], stdout=open('afile.txt', 'w'), hook=myhoo)
     ```
+
+    Returns
+    ---
+
+    ram_sequence : list of RAM (MB) used at each sample
+    real_time : total time in seconds
+    cpu_time : cpu time in seconds
+    ram_durations : list of the seconds covered by each sample of `ram_sequence`
     """
 
     ram_sequence = []
+    ram_durations = []
     cpu_times = {"main": 0}
     start_time = time.time()
     logger.info("Benchmarching command:")
     logger.info("     " + " ".join(popen_args[0]))
     popen = Popen(*popen_args, **popen_kwargs)
+    try:
+        # readable when the process ends (Linux >= 5.3), so that waiting doesn't
+        # poll the process as `Popen.wait` does
+        pidfd = os.pidfd_open(popen.pid)
+    except (AttributeError, OSError):
+        pidfd = None
+    else:
+        poller = select.poll()
+        poller.register(pidfd, select.POLLIN)
+    interval = 1
     while popen.poll() is None:
         try:
             times = popen.cpu_times()
@@ -104,6 +152,7 @@ def benchmark_command(*popen_args, hook=None, **popen_kwargs):
                 child_times = child.cpu_times()
                 ram += child.memory_info().rss
             except NoSuchProcess:
+                # exited: its last cpu time is kept in `cpu_times`
                 continue
             cpu_times[child.pid] = child_times.user + child_times.system
 
@@ -111,11 +160,82 @@ def benchmark_command(*popen_args, hook=None, **popen_kwargs):
             hook(popen, children, ram_sequence, cpu_times, start_time)
 
         ram_sequence.append(ram / (2**20))
-        time.sleep(1)
+        sample_time = time.time()
+        # returns as soon as the process ends, so the total time is exact
+        if pidfd is not None:
+            poller.poll(interval * 1000)
+        else:
+            try:
+                popen.wait(timeout=interval)
+            except TimeoutExpired:
+                pass
+        ram_durations.append(time.time() - sample_time)
+        interval = min(max_interval, interval * 1.2)
 
+    if pidfd is not None:
+        os.close(pidfd)
     cpu_time = sum(cpu_times.values())
     start_time = time.time() - start_time
-    return ram_sequence, start_time, cpu_time
+    return ram_sequence, start_time, cpu_time, ram_durations
+
+
+def detect_encoding(fname, chunk_size=2**16):
+    """
+    Detects the encoding of a file with `cchardet`, if installed, or `chardet`. The
+    file is fed to the detector in chunks of `chunk_size` bytes until it is
+    confident, so that it is not loaded in RAM all at once and usually only its
+    beginning is read.
+    """
+    detector = UniversalDetector()
+    with open(fname, "rb") as f:
+        while chunk := f.read(chunk_size):
+            detector.feed(chunk)
+            if detector.done:
+                break
+    detector.close()
+    return detector.result["encoding"]
+
+
+def count_csv_rows(fname, encoding=None):
+    """
+    Counts the rows of a csv file, header excluded. With pyarrow, only the first
+    column is parsed (as text) by the multi-threaded parser; otherwise, or if
+    pyarrow can't parse the file, `pd.read_csv` is used, loading only the first
+    column. A file with the header only has 0 rows; a file that can't be decoded
+    with `encoding` (default: utf-8) raises `UnicodeDecodeError`.
+    """
+    if pacsv is not None:
+        # the header is read as a row, so that a header-only file is not empty
+        read_options = pacsv.ReadOptions(
+            encoding=encoding or "utf8", autogenerate_column_names=True
+        )
+        convert_options = pacsv.ConvertOptions(
+            include_columns=["f0"], column_types={"f0": pa.string()}
+        )
+        try:
+            table = pacsv.read_csv(
+                str(fname), read_options=read_options, convert_options=convert_options
+            )
+        except pa.ArrowInvalid:
+            # e.g. invalid utf-8: pandas raises the proper error
+            pass
+        else:
+            return table.num_rows - 1
+    return pd.read_csv(fname, encoding=encoding, usecols=[0]).shape[0]
+
+
+def count_files(path, extensions):
+    """
+    Counts the files in `path` (recursively) whose name ends with one of
+    `extensions`, ignoring the case (e.g. `.MID` matches `.mid`), walking the
+    tree only once. As `Path.glob("**/*")`, hidden files and directories are
+    included and symbolic links to directories are not followed.
+    """
+    extensions = tuple(ext.lower() for ext in extensions)
+    n = 0
+    for _, _, files in os.walk(path):
+        n += sum(1 for f in files if f.lower().endswith(extensions))
+    return n
 
 
 def plotly_save(fig, fname):
@@ -0,0 +1,41 @@
+import pandas as pd
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from symbolic_features.data import read_csv  # noqa: E402
+
+
+def write(tmp_path, text):
+    path = tmp_path / "features.csv"
+    path.write_text(text)
+    return path
+
+
+def test_read_csv_duplicated_names(tmp_path):
+    path = write(tmp_path, "a,b,a,a.1,,\n1,x,2,3,4,5\n6,y,7,8,9,10\n")
+    expected = pd.read_csv(path)
+
+    df = read_csv(path)
+    assert list(df.columns) == ["a", "b", "a.2", "a.1", "Unnamed: 4", "Unnamed: 5"]
+    pd.testing.assert_frame_equal(df, expected)
+
+    chunks = list(read_csv(path, chunksize=1))
+    pd.testing.assert_frame_equal(pd.concat(chunks), expected)
+
+
+def test_read_csv_missing_values(tmp_path):
+    # pandas' missing values, not all of them are missing values for pyarrow
+    path = write(
+        tmp_path,
+        "num,na,text,fn\n1.5,1,x,f1\n<NA>,N/A,NA,f2\nnan,NULL,y,f3\n,#N/A,,f4\n",
+    )
+    expected = pd.read_csv(path)
+
+    df = read_csv(path)
+    pd.testing.assert_frame_equal(df, expected)
+
+    # numeric columns with missing values are not taken for text columns
+    df = read_csv(path, keep_str_cols={"fn"})
+    assert list(df.columns) == ["num", "na", "fn"]
+    pd.testing.assert_frame_equal(df, expected[["num", "na", "fn"]])
@@ -0,0 +1,45 @@
+import json
+import os
+from dataclasses import dataclass
+
+import pytest
+
+pytest.importorskip("autosklearn")
+
+from symbolic_features import effectiveness  # noqa: E402
+
+
+@dataclass
+class FakeTask:
+    name: str
+
+    def unload(self):
+        pass
+
+
+def record_automl(task, keep_first_10_pc, splitter, automl_time, output, n_jobs, debug):
+    with open(output, "w") as f:
+        json.dump({"pid": os.getpid(), "automl_time": automl_time, "debug": debug}, f)
+
+
+class RecordingMain(effectiveness.Main):
+    def _classify_task(self, task, splitter, n_jobs):
+        # patched in the worker process, where the task is run
+        effectiveness.automl = record_automl
+        return super()._classify_task(task, splitter, n_jobs)
+
+
+def test_classification_parallel_tasks(tmp_path, monkeypatch):
+    tasks = [FakeTask(str(tmp_path / f"task{i}")) for i in range(4)]
+    monkeypatch.setattr(effectiveness, "load_tasks", lambda keep_first_10_pc: tasks)
+
+    RecordingMain(automl_time=60, parallel_tasks=2).classification()
+
+    for task in tasks:
+        with open(task.name + ".csv") as f:
+            result = json.load(f)
+        # the options of the parent reach the workers
+        assert result["automl_time"] == 60
+        assert result["debug"] is False
+        assert result["pid"] != os.getpid()
+        assert not os.path.exists(task.name + ".lock")